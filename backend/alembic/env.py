@@ -13,7 +13,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 # Import your models here
 from app.models import Base
-from app.config import settings
+from app.config import get_settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -21,7 +21,7 @@ config = context.config
 
 # Override sqlalchemy.url with DATABASE_URL from environment
 # Escape % signs for ConfigParser (% -> %%)
-database_url = settings.DATABASE_URL.replace("%", "%%")
+database_url = get_settings().DATABASE_URL.replace("%", "%%")
 config.set_main_option("sqlalchemy.url", database_url)
 
 # Interpret the config file for Python logging.
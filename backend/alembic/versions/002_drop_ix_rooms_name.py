@@ -0,0 +1,31 @@
+"""Drop unused index on rooms.name
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rooms are only ever looked up by primary key, so the name index just
+    # adds write cost. If name search is added, prefer a trigram index:
+    #   CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    #   CREATE INDEX ix_rooms_name_trgm ON rooms USING gin (name gin_trgm_ops);
+    op.drop_index(op.f('ix_rooms_name'), table_name='rooms')
+
+
+def downgrade() -> None:
+    # Recreate index on name column
+    op.create_index(op.f('ix_rooms_name'), 'rooms', ['name'], unique=False)
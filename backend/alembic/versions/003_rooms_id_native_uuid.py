@@ -0,0 +1,45 @@
+"""Store rooms.id as a native uuid on PostgreSQL
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 16-byte uuid instead of 36-char text: smaller primary key index and
+    # integer comparisons on lookup. Other databases keep String(36).
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'rooms', 'id',
+        existing_type=sa.String(36),
+        type_=postgresql.UUID(as_uuid=False),
+        postgresql_using='id::uuid',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'rooms', 'id',
+        existing_type=postgresql.UUID(as_uuid=False),
+        type_=sa.String(36),
+        postgresql_using='id::text',
+    )
@@ -0,0 +1,55 @@
+"""Stamp rooms.created_at/updated_at on the database server
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows were always stamped by the application, backfill just in case
+    op.execute("UPDATE rooms SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE rooms SET updated_at = created_at WHERE updated_at IS NULL")
+
+    # batch mode so SQLite, which can't ALTER COLUMN, rebuilds the table
+    with op.batch_alter_table('rooms') as batch_op:
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        )
+        batch_op.alter_column(
+            'updated_at',
+            existing_type=sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('rooms') as batch_op:
+        batch_op.alter_column(
+            'updated_at',
+            existing_type=sa.TIMESTAMP(timezone=True),
+            server_default=None,
+            nullable=True,
+        )
+        batch_op.alter_column(
+            'created_at',
+            existing_type=sa.TIMESTAMP(timezone=True),
+            server_default=None,
+            nullable=True,
+        )
@@ -0,0 +1,27 @@
+"""Add ix_rooms_created_at for newest-first room listing
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-14
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # list_rooms orders by created_at, so paging reads the index instead of
+    # sorting the whole table. created_at is only written on insert.
+    op.create_index('ix_rooms_created_at', 'rooms', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rooms_created_at', table_name='rooms')
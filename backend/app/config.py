@@ -3,13 +3,16 @@ Application configuration.
 Loads settings from environment variables with defaults.
 """
 
-from pydantic_settings import BaseSettings
-from pydantic import field_validator
-from typing import List, Optional, Union
+from dotenv import dotenv_values
+from functools import lru_cache
+from typing import FrozenSet, Optional
+import msgspec
 import os
 
+__all__ = ["Settings", "get_settings", "load_settings"]
 
-class Settings(BaseSettings):
+
+class Settings(msgspec.Struct, frozen=True):
     """
     Application settings loaded from environment variables.
     Create a .env file to override defaults.
@@ -20,7 +23,8 @@ class Settings(BaseSettings):
 
     # CORS - origins allowed to access the API
     # Can be set as comma-separated string in env: "origin1,origin2,origin3"
-    ALLOWED_ORIGINS: Union[List[str], str] = [
+    # Stored as a frozenset so CORS checks are a single hash lookup
+    ALLOWED_ORIGINS: FrozenSet[str] = frozenset({
         # Local development
         "http://localhost:3000",
         "http://localhost:5173",
@@ -31,29 +35,54 @@ class Settings(BaseSettings):
         "https://riddhigangbhoj.com",
         "https://www.riddhigangbhoj.com",
         "https://api.riddhigangbhoj.com",
-    ]
-
-    @field_validator('ALLOWED_ORIGINS', mode='before')
-    @classmethod
-    def parse_allowed_origins(cls, v):
-        """Parse ALLOWED_ORIGINS from comma-separated string or list"""
-        if isinstance(v, str):
-            # Split by comma and strip whitespace
-            return [origin.strip() for origin in v.split(',') if origin.strip()]
-        return v
-    
+    })
+
     # Application
     DEBUG: bool = False  # Secure by default - set to True in .env for development
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-CHANGE-ME-IN-PRODUCTION")
+    SECRET_KEY: str = "dev-secret-key-CHANGE-ME-IN-PRODUCTION"
+
+    # Database connection pool (PostgreSQL only)
+    DB_POOL_SIZE: int = 20  # Persistent connections kept in the pool
+    DB_MAX_OVERFLOW: int = 30  # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Recycle connections after 30 minutes
+    DB_POOL_PRE_PING: bool = False  # Ping on checkout (costs a round trip per request)
 
     # AI/Autocomplete (placeholder for future integration)
     AI_MODEL: str = "mock"
     AI_API_KEY: Optional[str] = None
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 
-# Create global settings instance
-settings = Settings()
\ No newline at end of file
+def parse_allowed_origins(value: str) -> FrozenSet[str]:
+    """Parse ALLOWED_ORIGINS from a comma-separated string"""
+    # Split by comma and strip whitespace
+    return frozenset(origin.strip() for origin in value.split(',') if origin.strip())
+
+
+def load_settings(env_file: str = ".env") -> Settings:
+    """
+    Build settings from the .env file and environment variables.
+    Environment variables take precedence over the .env file. Names are
+    case sensitive and unknown variables are ignored.
+    """
+    values = {**dotenv_values(env_file), **os.environ}
+    fields = {
+        name: values[name]
+        for name in Settings.__struct_fields__
+        if values.get(name) is not None
+    }
+
+    if "ALLOWED_ORIGINS" in fields:
+        fields["ALLOWED_ORIGINS"] = parse_allowed_origins(fields["ALLOWED_ORIGINS"])
+
+    # strict=False lets msgspec coerce env strings ("True", "20") to bool/int
+    return msgspec.convert(fields, Settings, strict=False)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the application settings.
+    Parsed from the environment on first call and reused afterwards.
+    """
+    return load_settings()
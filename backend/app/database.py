@@ -1,13 +1,18 @@
 """
 Database configuration and session management.
-Sets up SQLAlchemy engine and provides database session dependency.
+Sets up the async SQLAlchemy engine and provides database session dependency.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import AsyncGenerator
 
-from app.config import settings
+from app.config import get_settings
+
+__all__ = ["async_engine", "AsyncSessionLocal", "get_db", "init_db"]
+
+settings = get_settings()
 
 
 # Database engine configuration
@@ -16,53 +21,106 @@ def get_engine_config():
     Get database engine configuration based on database type.
     Applies specific optimizations for PostgreSQL and SQLite.
     """
-    config = {
-        "echo": settings.DEBUG,
-        "pool_pre_ping": True,  # Verify connections before using them
-    }
+    config = {"echo": settings.DEBUG}
 
     if "sqlite" in settings.DATABASE_URL:
-        # SQLite specific configuration
+        # SQLite specific configuration: a local file has no network to
+        # check, so skip pre-ping. The pool is left to aiosqlite's default:
+        # NullPool for files, so concurrent sessions never share (and roll
+        # back) one connection, and StaticPool only for :memory:.
         config["connect_args"] = {"check_same_thread": False}
     elif "postgresql" in settings.DATABASE_URL:
         # PostgreSQL specific configuration for production
-        config["pool_size"] = 10  # Maximum connections in pool
-        config["max_overflow"] = 20  # Extra connections beyond pool_size
-        config["pool_timeout"] = 30  # Seconds to wait for connection
-        config["pool_recycle"] = 3600  # Recycle connections after 1 hour
+        # Pool sizing is configurable via DB_POOL_* settings
+        config.update({
+            # Verify connections before using them (off by default,
+            # pool_recycle retires stale connections instead)
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            # Reuse the most recently returned connection so idle ones age out
+            "pool_use_lifo": True,
+        })
 
     return config
 
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL, **get_engine_config())
+def get_async_database_url(database_url: str) -> str:
+    """
+    Convert a sync database URL to its asyncio driver equivalent.
+    postgresql:// uses asyncpg, sqlite:// uses aiosqlite and mysql:// uses aiomysql.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.get_backend_name() == "mysql":
+        url = url.set(drivername="mysql+aiomysql")
+    return url.render_as_string(hide_password=False)
+
+
+# Create async database engine. Queries are awaited so a slow statement
+# never blocks the event loop serving HTTP and WebSocket traffic.
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL), **get_engine_config()
+)
+
+if "sqlite" in settings.DATABASE_URL:
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_pragma(dbapi_conn, _connection_record):
+        """
+        Tune SQLite for frequent small writes. WAL lets readers run alongside
+        the writer and synchronous=NORMAL avoids an fsync on every commit.
+        """
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 # Dependency for getting database session
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency that provides a database session.
+    Dependency that provides an async database session.
     Automatically closes the session after the request.
-    
+
     Usage in FastAPI:
         @app.get("/rooms")
-        def get_rooms(db: Session = Depends(get_db)):
-            return db.query(Room).all()
+        async def get_rooms(db: AsyncSession = Depends(get_db)):
+            return (await db.execute(select(Room))).scalars().all()
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db() -> bool:
     """
     Initialize database - create all tables.
     Call this on application startup.
+
+    Skipped when the schema is managed by Alembic (an alembic_version table
+    exists), so every worker doesn't re-check each table on startup.
+
+    Returns:
+        True if tables were created/verified, False if skipped
     """
     from app.models import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    async with async_engine.begin() as conn:
+        has_alembic = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).has_table("alembic_version")
+        )
+        if has_alembic:
+            return False
+
+        await conn.run_sync(Base.metadata.create_all)
+        return True
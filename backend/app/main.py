@@ -6,23 +6,36 @@ Initializes the app, middleware, and routes.
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
+from logging.handlers import QueueHandler, QueueListener
 import logging
+import queue
 import sys
 
-from app.database import engine
-from app.models import Base
+from app.database import async_engine, init_db
 from app.routes import rooms, autocomplete, websocket
-from app.config import settings
+from app.config import get_settings
 from app.middleware import SecurityHeadersMiddleware
 
-# Configure logging
+settings = get_settings()
+
+# Configure logging. Handlers only enqueue records; a background
+# QueueListener thread does the actual stdout writes so request handlers
+# never block on the stream lock.
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+stdout_handler = logging.StreamHandler(sys.stdout)
+stdout_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+)
+log_listener = QueueListener(log_queue, stdout_handler, respect_handler_level=True)
+
 logging.basicConfig(
     level=logging.DEBUG if settings.DEBUG else logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(message)s',  # Full format is applied by stdout_handler
     handlers=[
-        logging.StreamHandler(sys.stdout)
+        QueueHandler(log_queue)
     ]
 )
 logger = logging.getLogger(__name__)
@@ -39,19 +52,22 @@ async def lifespan(app: FastAPI):
     Replaces deprecated @app.on_event("startup") and @app.on_event("shutdown")
     """
     # Startup
+    log_listener.start()
     logger.info("🚀 Starting Pair Programming App...")
 
     # Initialize database tables
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables created/verified")
+        if await init_db():
+            logger.info("✅ Database tables created/verified")
+        else:
+            logger.info("✅ Database schema managed by Alembic - skipping create_all")
     except Exception as e:
         logger.error(f"❌ Database initialization failed: {e}")
         raise
 
     if settings.DEBUG:
         logger.warning("⚠️  Running in DEBUG mode - DO NOT use in production!")
-        logger.info(f"CORS enabled for origins: {settings.ALLOWED_ORIGINS}")
+        logger.info(f"CORS enabled for origins: {sorted(settings.ALLOWED_ORIGINS)}")
     else:
         logger.info("Running in PRODUCTION mode")
 
@@ -61,7 +77,12 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("👋 Shutting down Pair Programming App...")
+
+    # Persist code edits still waiting on the WebSocket flush loop
+    await websocket.manager.flush_all()
+    await async_engine.dispose()
     logger.info("✅ Shutdown complete")
+    log_listener.stop()  # Flushes any queued records
 
 
 # ============================================================================
@@ -73,6 +94,7 @@ app = FastAPI(
     description="Real-time collaborative coding platform with AI-powered autocomplete",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if settings.DEBUG else None,  # Disable docs in production
     redoc_url="/redoc" if settings.DEBUG else None,
 )
@@ -86,7 +108,7 @@ app = FastAPI(
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors with detailed error messages"""
     logger.warning(f"Validation error on {request.url}: {exc.errors()}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "detail": exc.errors(),
@@ -102,7 +124,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 
     if settings.DEBUG:
         # Show details in development
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={
                 "detail": str(exc),
@@ -111,7 +133,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         )
     else:
         # Hide details in production
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"detail": "Internal server error"}
         )
@@ -128,15 +150,15 @@ if not settings.DEBUG:
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_origins=settings.ALLOWED_ORIGINS,  # frozenset: Starlette only does `in` checks
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
-# Request logging middleware
-@app.middleware("http")
+# Request logging middleware (development only - in production uvicorn's
+# access log already records every request)
 async def log_requests(request: Request, call_next):
     """Log all incoming requests"""
     logger.info(f"{request.method} {request.url.path}")
@@ -145,6 +167,10 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+if settings.DEBUG:
+    app.middleware("http")(log_requests)
+
+
 # ============================================================================
 # Route Inclusion
 # ============================================================================
@@ -1,13 +1,16 @@
 """
 Data models for the pair programming application.
-Includes both SQLAlchemy models (database) and Pydantic models (API validation).
+Includes SQLAlchemy models (database), Pydantic models (API validation) and
+msgspec structs (inbound WebSocket frames).
 """
 
 from datetime import datetime, timezone
-from typing import Optional, List
-from sqlalchemy import Column, String, Text, DateTime, func
+from typing import Annotated, Any, Optional, List
+from sqlalchemy import Column, String, Text, DateTime, Index, func
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import DeclarativeBase
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+import msgspec
 import uuid
 
 # SQLAlchemy 2.0 Style Base
@@ -26,12 +29,32 @@ class Room(Base):
     """
     __tablename__ = "rooms"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    name = Column(String(255), nullable=False, index=True)
+    # Native 16-byte uuid on PostgreSQL, text elsewhere; ids stay str in Python
+    id = Column(
+        String(36).with_variant(postgresql.UUID(as_uuid=False), "postgresql"),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4())
+    )
+    name = Column(String(255), nullable=False)
     code = Column(Text, default="# Start coding here...")
     language = Column(String(50), default="python")
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    # Stamped by the database rather than per row in Python. default= puts
+    # now() in the INSERT itself, for tables created without server_default.
+    created_at = Column(
+        DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # list_rooms pages through rooms newest first
+        Index("ix_rooms_created_at", "created_at"),
+    )
 
     def __repr__(self):
         return f"<Room {self.name} ({self.id})>"
@@ -43,16 +66,17 @@ class Room(Base):
 
 class RoomCreate(BaseModel):
     """Request model for creating a new room"""
-    name: str = Field(..., min_length=1, max_length=255, description="Room name")
-    language: Optional[str] = Field(default="python", description="Programming language")
+    name: Annotated[str, Field(min_length=1, max_length=255, description="Room name")]
+    language: Annotated[Optional[str], Field(description="Programming language")] = "python"
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "name": "My Coding Room",
                 "language": "python"
             }
         }
+    )
 
 
 class RoomResponse(BaseModel):
@@ -64,9 +88,9 @@ class RoomResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "abc123-def456",
                 "name": "My Coding Room",
@@ -76,6 +100,7 @@ class RoomResponse(BaseModel):
                 "updated_at": "2024-11-26T10:30:00"
             }
         }
+    )
 
 
 class CodeUpdate(BaseModel):
@@ -84,44 +109,49 @@ class CodeUpdate(BaseModel):
     code: str
     user_id: Optional[str] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        # Messages are never modified once parsed
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "room_id": "abc123",
                 "code": "print('Hello World')",
                 "user_id": "user_001"
             }
         }
+    )
 
 
 class AutocompleteRequest(BaseModel):
     """Request for AI autocomplete suggestions"""
-    code: str = Field(..., description="Current code context")
-    cursor_position: int = Field(..., ge=0, description="Cursor position in code")
-    language: Optional[str] = Field(default="python", description="Programming language")
+    code: Annotated[str, Field(description="Current code context")]
+    cursor_position: Annotated[int, Field(ge=0, description="Cursor position in code")]
+    language: Annotated[Optional[str], Field(description="Programming language")] = "python"
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "code": "def hel",
                 "cursor_position": 7,
                 "language": "python"
             }
         }
+    )
 
 
 class AutocompleteResponse(BaseModel):
     """Response with autocomplete suggestions"""
     suggestions: List[str]
-    confidence: float = Field(..., ge=0.0, le=1.0)
+    confidence: Annotated[float, Field(ge=0.0, le=1.0)]
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "suggestions": ["def hello_world():", "def help():"],
                 "confidence": 0.85
             }
         }
+    )
 
 
 class WebSocketMessage(BaseModel):
@@ -132,14 +162,34 @@ class WebSocketMessage(BaseModel):
     type: str
     data: dict
     user_id: Optional[str] = None
-    timestamp: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
+    timestamp: Annotated[
+        Optional[datetime], Field(default_factory=lambda: datetime.now(timezone.utc))
+    ]
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        # Messages are never modified once parsed
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "type": "code_update",
                 "data": {"code": "print('hello')"},
                 "user_id": "user_001",
                 "timestamp": "2024-11-26T10:30:00"
             }
-        }
\ No newline at end of file
+        }
+    )
+
+
+# ============================================================================
+# msgspec Structs (WebSocket Frames)
+# ============================================================================
+
+class WSMessage(msgspec.Struct):
+    """
+    Inbound WebSocket frame. Decoded from JSON straight into this struct by
+    msgspec, without building an intermediate dict or a Pydantic model.
+    """
+    type: str
+    # Validated per message type by the handler
+    data: Any = msgspec.field(default_factory=dict)
+    user_id: Optional[str] = None
@@ -8,10 +8,11 @@ import logging
 
 from app.models import AutocompleteRequest, AutocompleteResponse
 from app.services.autocomplete_service import AutocompleteService
-from app.config import settings
+from app.config import get_settings
 
 
 router = APIRouter()
+settings = get_settings()
 autocomplete_service = AutocompleteService()
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ async def get_autocomplete_suggestions(request: AutocompleteRequest):
             f"Autocomplete request for {request.language} at position {request.cursor_position}"
         )
 
-        suggestions = autocomplete_service.get_suggestions(
+        suggestions = await autocomplete_service.get_suggestions(
             code=request.code,
             cursor_position=request.cursor_position,
             language=request.language
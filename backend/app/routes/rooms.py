@@ -4,8 +4,9 @@ Handles creating, retrieving, listing, and deleting rooms.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from uuid import UUID
 
 from app.database import get_db
 from app.models import RoomCreate, RoomResponse
@@ -13,27 +14,26 @@ from app.services.room_service import RoomService
 
 
 router = APIRouter()
+room_service = RoomService()
 
 
 @router.post("/", response_model=RoomResponse, status_code=status.HTTP_201_CREATED)
-async def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
+async def create_room(room_data: RoomCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new coding room for pair programming.
     - **name**: Name of the room
     - **language**: Programming language (default: python)
     """
-    room_service = RoomService(db)
-    room = room_service.create_room(room_data)
+    room = await room_service.create_room(db, room_data)
     return room
 
 
 @router.get("/{room_id}", response_model=RoomResponse)
-async def get_room(room_id: str, db: Session = Depends(get_db)):
+async def get_room(room_id: UUID, db: AsyncSession = Depends(get_db)):
     """
     Get room details by ID.
     """
-    room_service = RoomService(db)
-    room = room_service.get_room(room_id)
+    room = await room_service.get_room(db, str(room_id))
     
     if not room:
         raise HTTPException(
@@ -45,22 +45,20 @@ async def get_room(room_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[RoomResponse])
-async def list_rooms(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def list_rooms(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
     """
     List all available rooms.
     """
-    room_service = RoomService(db)
-    rooms = room_service.list_rooms(skip=skip, limit=limit)
+    rooms = await room_service.list_rooms(db, skip=skip, limit=limit)
     return rooms
 
 
 @router.delete("/{room_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_room(room_id: str, db: Session = Depends(get_db)):
+async def delete_room(room_id: UUID, db: AsyncSession = Depends(get_db)):
     """
     Delete a room by ID.
     """
-    room_service = RoomService(db)
-    success = room_service.delete_room(room_id)
+    success = await room_service.delete_room(db, str(room_id))
     
     if not success:
         raise HTTPException(
@@ -3,21 +3,108 @@ WebSocket endpoints for real-time collaboration.
 Handles WebSocket connections, message broadcasting, and room synchronization.
 """
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlalchemy.exc import DBAPIError, DisconnectionError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-import json
+from typing import Dict, Optional
+from uuid import UUID
+import itertools
 import logging
+import msgspec
+import orjson
 
-from app.database import get_db
+from app.database import AsyncSessionLocal
+from app.models import WSMessage
 from app.services.websocket_manager import WebSocketManager
-from app.services.room_service import RoomService
+from app.services.room_service import RoomService, room_cache
 
 
 router = APIRouter()
-manager = WebSocketManager()
+room_service = RoomService()
 logger = logging.getLogger(__name__)
 
+# Decodes and validates inbound frames in a single pass
+message_decoder = msgspec.json.Decoder(WSMessage)
+
+
+def stamp() -> datetime:
+    """
+    Current UTC time for outgoing messages.
+    Left as a datetime, orjson writes it out as ISO 8601 while encoding.
+    """
+    return datetime.now(timezone.utc)
+
+
+async def update_room_code_with_retry(db: AsyncSession, room_id: str, code: str):
+    """
+    Persist room code, retrying once if the pooled connection turned out to be dead.
+
+    pool_pre_ping is off by default, so a connection dropped by the server is
+    only detected when it is used. The pool invalidates it and the retry runs
+    on a fresh connection.
+    """
+    try:
+        return await room_service.update_room_code(db, room_id, code)
+    except (DisconnectionError, DBAPIError) as e:
+        if isinstance(e, DBAPIError) and not e.connection_invalidated:
+            raise
+        logger.warning(f"Stale database connection for room {room_id}, retrying: {e}")
+        return await room_service.update_room_code(db, room_id, code)
+
+
+async def save_room_code(room_id: str, code: str):
+    """Persist the latest code for a room in its own short-lived session."""
+    async with AsyncSessionLocal() as db:
+        await update_room_code_with_retry(db, room_id, code)
+
+
+manager = WebSocketManager(save_code=save_room_code)
+
+
+# Snapshot loads in flight: room_id -> {load id: latest code from a
+# code_update that arrived during that load, or None}. The row being read may
+# predate such an edit, so the load uses the edit's code instead.
+_snapshot_loads: Dict[str, Dict[int, Optional[str]]] = {}
+_snapshot_load_ids = itertools.count()
+
+
+async def get_room_snapshot(room_id: str) -> Optional[dict]:
+    """
+    Get the code and language for a room, from room_cache when possible.
+    Returns None if the room doesn't exist (misses are not cached).
+    """
+    snapshot = room_cache.get(room_id)
+    if snapshot is None:
+        load_id = next(_snapshot_load_ids)
+        loads = _snapshot_loads.setdefault(room_id, {})
+        loads[load_id] = None
+        try:
+            async with AsyncSessionLocal() as db:
+                room = await room_service.get_room(db, room_id)
+        finally:
+            edited_code = loads.pop(load_id)
+            if not loads:
+                _snapshot_loads.pop(room_id, None)
+        if not room:
+            return None
+        code = room.code if edited_code is None else edited_code
+        snapshot = {"code": code, "language": room.language}
+        room_cache[room_id] = snapshot
+    return snapshot
+
+
+def record_code_update(room_id: str, code: str):
+    """Keep the cached snapshot, and any snapshot being loaded, on the latest code."""
+    snapshot = room_cache.get(room_id)
+    if snapshot is not None:
+        snapshot["code"] = code
+
+    loads = _snapshot_loads.get(room_id)
+    if loads:
+        for load_id in loads:
+            loads[load_id] = code
+
 
 @router.websocket("/ws/{room_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str):
@@ -31,181 +118,154 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     - Broadcasting to all connected clients
     """
 
-    # Get database session
-    db: Session = next(get_db())
-
+    # Reject malformed ids before touching the database (PostgreSQL stores
+    # ids as native UUIDs) and use the canonical form as the room key
     try:
-        room_service = RoomService(db)
+        room_id = str(UUID(room_id))
+    except ValueError:
+        logger.warning(f"WebSocket connection rejected: Invalid room id {room_id}")
+        await websocket.close(code=1008, reason="Room not found")
+        return
 
-        # Verify room exists BEFORE accepting connection
-        room = room_service.get_room(room_id)
-        if not room:
-            logger.warning(f"WebSocket connection rejected: Room {room_id} not found")
-            await websocket.close(code=1008, reason="Room not found")
-            return
+    # Verify room exists BEFORE accepting connection. Any database session is
+    # only held for the lookup so idle sockets don't pin a pooled connection.
+    room = await get_room_snapshot(room_id)
+    if not room:
+        logger.warning(f"WebSocket connection rejected: Room {room_id} not found")
+        await websocket.close(code=1008, reason="Room not found")
+        return
 
-        # Accept the connection and get user_id
-        user_id = await manager.connect(websocket, room_id)
-        user_name = f"User-{user_id}"  # Simple user name for now
-        logger.info(f"WebSocket connected to room {room_id} with user_id {user_id}")
+    # Accept the connection and get user_id
+    user_id = await manager.connect(websocket, room_id)
+    user_name = f"User-{user_id}"  # Simple user name for now
+    logger.info(f"WebSocket connected to room {room_id} with user_id {user_id}")
 
-        try:
-            # Send initial room state
-            await websocket.send_json({
-                "type": "init",
+    try:
+        now = stamp()
+
+        # Send initial room state, including edits still waiting to be saved
+        pending_code = manager.get_pending_code(room_id)
+        manager.send_init(
+            room_id,
+            websocket,
+            code=room["code"] if pending_code is None else pending_code,
+            language=room["language"],
+            timestamp=now
+        )
+
+        # Notify others that a user joined
+        user_count = manager.get_room_connection_count(room_id)
+        manager.broadcast(
+            room_id,
+            {
+                "type": "user_joined",
                 "data": {
                     "room_id": room_id,
-                    "code": room.code,
-                    "language": room.language
+                    "user_count": user_count
                 },
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
-
-            # Notify others that a user joined
-            user_count = len(manager.active_connections.get(room_id, []))
-            await manager.broadcast(
-                room_id,
-                {
-                    "type": "user_joined",
-                    "data": {
-                        "room_id": room_id,
-                        "user_count": user_count
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                },
-                exclude=websocket
-            )
-            logger.debug(f"User joined room {room_id}, total users: {user_count}")
-
-            # Listen for messages
-            while True:
-                data = await websocket.receive_text()
-
-                # Handle invalid JSON
-                try:
-                    message = json.loads(data)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Invalid JSON from room {room_id}: {e}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": "Invalid JSON format"},
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
+                "timestamp": now
+            },
+            exclude=websocket
+        )
+        logger.debug(f"User joined room {room_id}, total users: {user_count}")
+
+        # Listen for messages
+        while True:
+            data = await websocket.receive_text()
+
+            # Decode and validate message structure (ValidationError is a
+            # DecodeError subclass, so it has to be caught first)
+            try:
+                message = message_decoder.decode(data)
+            except msgspec.ValidationError as e:
+                logger.warning(f"Invalid message structure from room {room_id}: {e}")
+                manager.send_error(room_id, websocket, "Invalid message structure", stamp())
+                continue
+            except msgspec.DecodeError as e:
+                logger.warning(f"Invalid JSON from room {room_id}: {e}")
+                manager.send_error(room_id, websocket, "Invalid JSON format", stamp())
+                continue
+
+            msg_type = message.type
+            msg_data = message.data
+
+            # Handle different message types
+            if msg_type == "code_update":
+                # Validate data structure
+                if not isinstance(msg_data, dict) or "code" not in msg_data:
+                    manager.send_error(room_id, websocket, "Invalid code_update format", stamp())
                     continue
 
-                # Validate message structure
-                if not isinstance(message, dict) or "type" not in message:
-                    logger.warning(f"Invalid message structure from room {room_id}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": "Invalid message structure"},
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
+            elif msg_type == "cursor_update":
+                # Validate data structure
+                if not isinstance(msg_data, dict):
+                    manager.send_error(room_id, websocket, "Invalid cursor_update format", stamp())
                     continue
 
-                msg_type = message.get("type")
-                msg_data = message.get("data", {})
-
-                # Handle different message types
-                if msg_type == "code_update":
-                    # Validate data structure
-                    if not isinstance(msg_data, dict) or "code" not in msg_data:
-                        await websocket.send_json({
-                            "type": "error",
-                            "data": {"message": "Invalid code_update format"},
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        })
-                        continue
-
-                    # Handle database errors
-                    try:
-                        room_service.update_room_code(room_id, msg_data["code"])
-                    except Exception as e:
-                        logger.error(f"Failed to update room {room_id}: {e}")
-                        await websocket.send_json({
-                            "type": "error",
-                            "data": {"message": "Failed to save code"},
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        })
-                        continue
-
-                    # Broadcast to all clients except sender
-                    await manager.broadcast(
-                        room_id,
-                        {
-                            "type": "code_update",
-                            "data": msg_data,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        },
-                        exclude=websocket
-                    )
-                    logger.debug(f"Code updated in room {room_id}")
-
-                elif msg_type == "cursor_position":
-                    # Broadcast cursor position to others
-                    await manager.broadcast(
-                        room_id,
-                        {
-                            "type": "cursor_position",
-                            "data": msg_data,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        },
-                        exclude=websocket
-                    )
-
-                elif msg_type == "cursor_update":
-                    # Broadcast cursor update with user info to others
-                    msg_data["user_id"] = user_id
-                    msg_data["user_name"] = user_name
-                    await manager.broadcast(
-                        room_id,
-                        {
-                            "type": "cursor_update",
-                            "data": msg_data,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        },
-                        exclude=websocket
-                    )
-
-                else:
-                    # Unknown message type
-                    logger.debug(f"Unknown message type '{msg_type}' from room {room_id}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": f"Unknown message type: {msg_type}"},
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
-
-        except WebSocketDisconnect:
-            logger.info(f"WebSocket disconnected from room {room_id}")
-            disconnected_user_id = manager.disconnect(websocket, room_id)
-
-            # Notify others that a user left
-            user_count = len(manager.active_connections.get(room_id, []))
-            await manager.broadcast(
-                room_id,
-                {
-                    "type": "user_left",
-                    "data": {
-                        "room_id": room_id,
-                        "user_id": disconnected_user_id,
-                        "user_count": user_count
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-            )
-            logger.debug(f"User {disconnected_user_id} left room {room_id}, remaining users: {user_count}")
-
-        except Exception as e:
-            # Handle unexpected errors
-            logger.error(f"WebSocket error in room {room_id}: {e}", exc_info=True)
-            manager.disconnect(websocket, room_id)
+                # Attach user info so others can label the cursor
+                msg_data["user_id"] = user_id
+                msg_data["user_name"] = user_name
+
+            elif msg_type != "cursor_position":
+                # Unknown message type
+                logger.debug(f"Unknown message type '{msg_type}' from room {room_id}")
+                manager.send_error(
+                    room_id, websocket, f"Unknown message type: {msg_type}", stamp(), cache=False
+                )
+                continue
+
+            # Broadcast to all clients except sender
             try:
-                await websocket.close(code=1011, reason="Internal server error")
-            except:
-                pass  # Connection might already be closed
-
-    finally:
-        # Always close database session
-        db.close()
-        logger.debug(f"Database session closed for room {room_id}")
\ No newline at end of file
+                manager.broadcast(
+                    room_id,
+                    {
+                        "type": msg_type,
+                        "data": msg_data,
+                        "timestamp": stamp()
+                    },
+                    exclude=websocket
+                )
+            except orjson.JSONEncodeError as e:
+                # Valid JSON orjson can't write back out, e.g. integers
+                # beyond 64 bits
+                logger.warning(f"Unencodable {msg_type} from room {room_id}: {e}")
+                manager.send_error(room_id, websocket, "Message could not be encoded", stamp())
+                continue
+
+            if msg_type == "code_update":
+                # Persist in the background, coalescing rapid keystrokes.
+                # Only once broadcast, so peers never miss a saved edit.
+                manager.schedule_code_save(room_id, msg_data["code"])
+                record_code_update(room_id, msg_data["code"])
+                logger.debug(f"Code updated in room {room_id}")
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket disconnected from room {room_id}")
+        # The manager may already have dropped a client that fell behind,
+        # so report the user_id assigned at connect
+        manager.disconnect(websocket, room_id)
+
+        # Notify others that a user left
+        user_count = manager.get_room_connection_count(room_id)
+        manager.broadcast(
+            room_id,
+            {
+                "type": "user_left",
+                "data": {
+                    "room_id": room_id,
+                    "user_id": user_id,
+                    "user_count": user_count
+                },
+                "timestamp": stamp()
+            }
+        )
+        logger.debug(f"User {user_id} left room {room_id}, remaining users: {user_count}")
+
+    except Exception as e:
+        # Handle unexpected errors
+        logger.error(f"WebSocket error in room {room_id}: {e}", exc_info=True)
+        manager.disconnect(websocket, room_id)
+        try:
+            await websocket.close(code=1011, reason="Internal server error")
+        except:
+            pass  # Connection might already be closed
@@ -4,7 +4,8 @@ Currently uses mock data - ready for real AI integration.
 """
 
 from app.models import AutocompleteResponse
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import asyncio
 import random
 import logging
 
@@ -84,9 +85,18 @@ class AutocompleteService:
                 "go func() {"
             ]
         }
+        # Map of language -> (pool, number of suggestions to sample), so a
+        # request needs a single dict lookup. Keys above are already lowercase.
+        self.pools: Dict[str, Tuple[List[str], int]] = {
+            lang: (pool, min(3, len(pool))) for lang, pool in self.mock_suggestions.items()
+        }
+        self.default_pool: Tuple[List[str], int] = self.pools["python"]
+        # Map of (language, cursor_position, code) -> result of the request
+        # currently generating suggestions for that exact input
+        self._inflight: Dict[Tuple[str, int, str], asyncio.Future] = {}
         logger.info("AutocompleteService initialized with mock suggestions")
 
-    def get_suggestions(
+    async def get_suggestions(
         self,
         code: str,
         cursor_position: int,
@@ -95,6 +105,9 @@ class AutocompleteService:
         """
         Get autocomplete suggestions based on code context.
 
+        Concurrent requests for identical input share a single generation
+        instead of each calling the model.
+
         This is a mock implementation. In production, this would integrate
         with an AI model (OpenAI, Anthropic Claude, etc.)
 
@@ -129,25 +142,56 @@ class AutocompleteService:
             f"code_length={len(code)}, cursor_position={cursor_position}"
         )
 
-        # Get suggestions for the language, default to Python
-        suggestions_pool = self.mock_suggestions.get(
-            language.lower(),
-            self.mock_suggestions["python"]
-        )
+        lang = language.lower()
+        # Key on everything _generate sees, so a joined request never gets
+        # the answer for different input
+        key = (lang, cursor_position, code)
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            logger.debug(f"Joining in-flight autocomplete request for {language}")
+            # Unlike awaiting the future, wait() neither cancels it if this
+            # request is cancelled nor raises if the leading request was
+            await asyncio.wait((inflight,))
+            if not inflight.cancelled():
+                return inflight.result()
+            # The leading request was cancelled (e.g. its client went away),
+            # so generate here or join whichever request took over
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._generate(code, lang)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so a request nobody joined doesn't warn
+                future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            del self._inflight[key]
+
+    async def _generate(self, code: str, language: str) -> AutocompleteResponse:
+        """
+        Generate suggestions for validated input. language is already lowercase.
 
-        if language.lower() not in self.mock_suggestions:
+        Mock implementation - replace with a call to the AI model.
+        """
+        # Get suggestions for the language, default to Python
+        pool = self.pools.get(language)
+        if pool is None:
             logger.info(
                 f"Language '{language}' not in mock data, defaulting to Python"
             )
+            pool = self.default_pool
+        suggestions_pool, num_suggestions = pool
 
-        try:
-            # Return 3 random suggestions (mock behavior)
-            num_suggestions = min(3, len(suggestions_pool))
-            suggestions = random.sample(suggestions_pool, num_suggestions)
-        except ValueError as e:
-            # Handle edge case where suggestions_pool is empty
-            logger.error(f"Error sampling suggestions: {e}")
-            suggestions = []
+        # Return 3 random suggestions (mock behavior)
+        suggestions = random.sample(suggestions_pool, num_suggestions)
 
         # Mock confidence based on code length (longer code = higher confidence)
         # In real AI, this would come from the model
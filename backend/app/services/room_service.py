@@ -3,28 +3,36 @@ Room service for managing coding rooms.
 Handles all business logic for room operations.
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from cachetools import TTLCache
 from typing import Optional, List
-from datetime import datetime, timezone
 import logging
 
 from app.models import Room, RoomCreate
 
 logger = logging.getLogger(__name__)
 
+# Snapshot of recently used rooms ({"code": ..., "language": ...}) keyed by
+# room_id, so WebSocket reconnects don't each need a SELECT
+room_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
 
 class RoomService:
-    """Service for managing coding rooms with proper error handling."""
+    """
+    Service for managing coding rooms with proper error handling.
 
-    def __init__(self, db: Session):
-        self.db = db
+    Stateless - the database session is passed to each method, so a single
+    instance can be shared across requests.
+    """
 
-    def create_room(self, room_data: RoomCreate) -> Room:
+    async def create_room(self, db: AsyncSession, room_data: RoomCreate) -> Room:
         """
         Create a new room.
 
         Args:
+            db: Database session
             room_data: Room creation data
 
         Returns:
@@ -39,35 +47,37 @@ class RoomService:
                 language=room_data.language or "python",
                 code="# Start coding here..."
             )
-            self.db.add(room)
-            self.db.commit()
-            self.db.refresh(room)
+            db.add(room)
+            await db.commit()
+            await db.refresh(room)
 
             logger.info(f"Created room: {room.id} - {room.name}")
             return room
 
         except IntegrityError as e:
-            self.db.rollback()
+            await db.rollback()
             logger.error(f"Integrity error creating room: {e}")
             raise
 
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await db.rollback()
             logger.error(f"Database error creating room: {e}")
             raise
 
-    def get_room(self, room_id: str) -> Optional[Room]:
+    async def get_room(self, db: AsyncSession, room_id: str) -> Optional[Room]:
         """
         Get a room by ID.
 
         Args:
+            db: Database session
             room_id: UUID of the room
 
         Returns:
             Room object if found, None otherwise
         """
         try:
-            room = self.db.query(Room).filter(Room.id == room_id).first()
+            # Primary-key lookup checks the session's identity map first
+            room = await db.get(Room, room_id)
             if room:
                 logger.debug(f"Retrieved room: {room_id}")
             else:
@@ -78,11 +88,12 @@ class RoomService:
             logger.error(f"Database error getting room {room_id}: {e}")
             raise
 
-    def list_rooms(self, skip: int = 0, limit: int = 100) -> List[Room]:
+    async def list_rooms(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Room]:
         """
-        List all rooms with pagination.
+        List all rooms with pagination, newest first.
 
         Args:
+            db: Database session
             skip: Number of rooms to skip
             limit: Maximum number of rooms to return
 
@@ -90,7 +101,14 @@ class RoomService:
             List of room objects
         """
         try:
-            rooms = self.db.query(Room).offset(skip).limit(limit).all()
+            rooms = list(await db.scalars(
+                select(Room)
+                # id breaks ties between rooms created in the same second
+                # (SQLite's CURRENT_TIMESTAMP), keeping offset pages disjoint
+                .order_by(Room.created_at.desc(), Room.id)
+                .offset(skip)
+                .limit(limit)
+            ))
             logger.debug(f"Listed {len(rooms)} rooms (skip={skip}, limit={limit})")
             return rooms
 
@@ -98,43 +116,52 @@ class RoomService:
             logger.error(f"Database error listing rooms: {e}")
             raise
 
-    def update_room_code(self, room_id: str, code: str) -> Optional[Room]:
+    async def update_room_code(self, db: AsyncSession, room_id: str, code: str) -> bool:
         """
         Update the code in a room.
 
+        Issues a single UPDATE ... RETURNING instead of loading the row first.
+
         Args:
+            db: Database session
             room_id: UUID of the room
             code: New code content
 
         Returns:
-            Updated room object if found, None otherwise
+            True if updated, False if room not found
 
         Raises:
             SQLAlchemyError: If database operation fails
         """
         try:
-            room = self.get_room(room_id)
-            if room:
-                room.code = code
-                # Explicitly update the timestamp
-                room.updated_at = datetime.now(timezone.utc)
-                self.db.commit()
-                self.db.refresh(room)
+            result = await db.execute(
+                update(Room)
+                .where(Room.id == room_id)
+                .values(code=code)  # updated_at is set by its onupdate default
+                .returning(Room.id)
+                # The session never holds this room, skip syncing the identity map
+                .execution_options(synchronize_session=False)
+            )
+            updated = result.scalar_one_or_none() is not None
+            await db.commit()
+
+            if updated:
                 logger.debug(f"Updated code in room: {room_id}")
             else:
                 logger.warning(f"Cannot update code - room not found: {room_id}")
-            return room
+            return updated
 
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await db.rollback()
             logger.error(f"Database error updating room {room_id}: {e}")
             raise
 
-    def delete_room(self, room_id: str) -> bool:
+    async def delete_room(self, db: AsyncSession, room_id: str) -> bool:
         """
         Delete a room by ID.
 
         Args:
+            db: Database session
             room_id: UUID of the room
 
         Returns:
@@ -144,10 +171,11 @@ class RoomService:
             SQLAlchemyError: If database operation fails
         """
         try:
-            room = self.get_room(room_id)
+            room = await self.get_room(db, room_id)
             if room:
-                self.db.delete(room)
-                self.db.commit()
+                await db.delete(room)
+                await db.commit()
+                room_cache.pop(room_id, None)
                 logger.info(f"Deleted room: {room_id} - {room.name}")
                 return True
             else:
@@ -155,6 +183,6 @@ class RoomService:
                 return False
 
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await db.rollback()
             logger.error(f"Database error deleting room {room_id}: {e}")
             raise
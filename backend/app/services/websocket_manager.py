@@ -5,21 +5,116 @@ This is the core of the real-time collaboration system.
 """
 
 from fastapi import WebSocket
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import itertools
 import logging
-import uuid
+import orjson
+import secrets
+import string
 
 logger = logging.getLogger(__name__)
 
+# Seconds between writes of pending room code. Keystrokes arriving in the
+# meantime only replace the pending value, so typing costs ~5 writes/sec
+# per room no matter how fast anyone types.
+CODE_FLUSH_INTERVAL = 0.2
+
+# Seconds a single client may take to accept a frame before it is dropped
+SEND_TIMEOUT = 5
+
+# Frames that may wait for a slow client before it is disconnected
+SEND_QUEUE_SIZE = 256
+
+
+_BASE62 = string.digits + string.ascii_letters
+
+
+def _base62(n: int) -> str:
+    """Encode a non-negative integer in base62."""
+    digits = []
+    while True:
+        n, rem = divmod(n, 62)
+        digits.append(_BASE62[rem])
+        if not n:
+            return "".join(reversed(digits))
+
+
+# User ids are a per-process counter behind a random prefix, so ids stay short
+# and don't repeat across restarts in the common case
+_user_id_prefix = _base62(secrets.randbelow(62 ** 2)).rjust(2, "0")
+_user_id_counter = itertools.count()
+
+
+def _next_user_id() -> str:
+    """Return a new short user id, unique within this process."""
+    return _user_id_prefix + _base62(next(_user_id_counter))
+
+
+def _encode(message: dict) -> str:
+    """
+    Encode an outgoing message as JSON.
+
+    Frames stay text because the browser client JSON.parse()s event.data;
+    naive datetimes are treated as UTC.
+    """
+    return orjson.dumps(message, option=orjson.OPT_NAIVE_UTC).decode()
+
+
+def _text_event(text: str) -> dict:
+    """
+    ASGI event sending text as a WebSocket frame.
+
+    Built once per message and shared by every recipient's queue; writers
+    pass it straight to the ASGI send rather than each going through send_text.
+    """
+    return {"type": "websocket.send", "text": text}
+
+
+def _frame(msg_type: str, data: str, timestamp) -> str:
+    """Build a message from an already encoded data object."""
+    return f'{{"type":"{msg_type}","data":{data},"timestamp":{_encode(timestamp)}}}'
+
+
+@lru_cache(maxsize=64)
+def _error_data(message: str) -> str:
+    """Encoded data object for one of the fixed error messages."""
+    return _encode({"message": message})
+
+
+class Connection(NamedTuple):
+    """A client in a room and the outbound queue drained by its writer task."""
+    user_id: str
+    queue: asyncio.Queue
+    writer: asyncio.Task
+
 
 class WebSocketManager:
     """Manager for WebSocket connections and broadcasting."""
 
-    def __init__(self):
-        # Map of room_id -> list of (WebSocket, user_id) tuples
-        self.active_connections: Dict[str, List[Tuple[WebSocket, str]]] = {}
+    def __init__(self, save_code: Optional[Callable[[str, str], Awaitable[None]]] = None):
+        # Map of room_id -> {WebSocket: Connection}
+        self.active_connections: Dict[str, Dict[WebSocket, Connection]] = {}
+        # Tasks closing dropped clients, referenced until done so they aren't
+        # garbage collected mid-close
+        self._close_tasks: Set[asyncio.Task] = set()
         # Map of WebSocket -> user_id
         self.websocket_to_user: Dict[WebSocket, str] = {}
+        # Coroutine used to persist room code, called as save_code(room_id, code)
+        self._save_code = save_code
+        # Map of room_id -> latest code not yet persisted
+        self._pending_code: Dict[str, str] = {}
+        # Map of room_id -> code taken by the flush loop whose save hasn't
+        # finished yet
+        self._saving_code: Dict[str, str] = {}
+        # Task persisting pending code for all rooms, running while any is pending
+        self._flush_task: Optional[asyncio.Task] = None
+        # Map of room_id -> encoded data object of the init frame
+        self._init_cache: Dict[str, str] = {}
+        # Map of room_id -> snapshot of its (WebSocket, Connection) pairs,
+        # rebuilt only after someone joins or leaves
+        self._members: Dict[str, Tuple[Tuple[WebSocket, Connection], ...]] = {}
         logger.info("WebSocketManager initialized")
     
     async def connect(self, websocket: WebSocket, room_id: str) -> str:
@@ -27,15 +122,22 @@ class WebSocketManager:
         await websocket.accept()
 
         # Generate unique user ID
-        user_id = str(uuid.uuid4())[:8]  # Short user ID
+        user_id = _next_user_id()
 
         if room_id not in self.active_connections:
-            self.active_connections[room_id] = []
+            self.active_connections[room_id] = {}
             logger.info(f"Created new room: {room_id}")
 
-        self.active_connections[room_id].append((websocket, user_id))
+        # Frames for this client are queued and sent by its own writer task,
+        # so a slow client never holds up the sender or the rest of the room
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        writer = asyncio.create_task(self._writer(websocket, room_id, queue))
+
+        room = self.active_connections[room_id]
+        room[websocket] = Connection(user_id, queue, writer)
+        self._members.pop(room_id, None)
         self.websocket_to_user[websocket] = user_id
-        connection_count = len(self.active_connections[room_id])
+        connection_count = len(room)
         logger.info(
             f"WebSocket connected to room {room_id} with user_id {user_id} "
             f"(total connections: {connection_count})"
@@ -44,71 +146,182 @@ class WebSocketManager:
     
     def disconnect(self, websocket: WebSocket, room_id: str) -> Optional[str]:
         """Remove a WebSocket connection from a room. Returns user_id if found."""
-        user_id = self.websocket_to_user.get(websocket)
-
-        if room_id in self.active_connections:
-            # Find and remove the connection tuple
-            self.active_connections[room_id] = [
-                (ws, uid) for ws, uid in self.active_connections[room_id]
-                if ws != websocket
-            ]
-            connection_count = len(self.active_connections[room_id])
-            logger.info(
-                f"WebSocket disconnected from room {room_id} "
-                f"(remaining connections: {connection_count})"
-            )
+        user_id = self.websocket_to_user.pop(websocket, None)
 
-            # Clean up empty rooms
-            if len(self.active_connections[room_id]) == 0:
-                del self.active_connections[room_id]
-                logger.info(f"Room {room_id} removed (no active connections)")
+        room = self.active_connections.get(room_id)
+        connection = room.pop(websocket, None) if room is not None else None
+        if connection is None:
+            # Already removed, e.g. dropped for falling behind
+            return user_id
 
-        # Clean up user mapping
-        if websocket in self.websocket_to_user:
-            del self.websocket_to_user[websocket]
+        self._members.pop(room_id, None)
+        if connection.writer is not asyncio.current_task():
+            # Unsent frames are dropped along with the queue
+            connection.writer.cancel()
+
+        logger.info(
+            f"WebSocket disconnected from room {room_id} "
+            f"(remaining connections: {len(room)})"
+        )
+
+        # Clean up empty rooms
+        if not room:
+            del self.active_connections[room_id]
+            self._init_cache.pop(room_id, None)
+            logger.info(f"Room {room_id} removed (no active connections)")
 
         return user_id
-    
-    async def broadcast(self, room_id: str, message: dict, exclude: Optional[WebSocket] = None):
+
+    async def _writer(self, websocket: WebSocket, room_id: str, queue: asyncio.Queue):
+        """Send queued frames to one connection, in order, until a send fails."""
+        while True:
+            event = await queue.get()
+            try:
+                await asyncio.wait_for(websocket.send(event), timeout=SEND_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Failed to send to connection in room {room_id}: {e!r}")
+                self.disconnect(websocket, room_id)
+                # Close it too, otherwise a client that is still reading never
+                # reconnects and keeps editing a document it no longer sees
+                await self._close(websocket, 1011, "Send failed")
+                return
+
+    def _enqueue(self, room_id: str, websocket: WebSocket, connection: Connection, event: dict):
+        """Queue a frame for a connection, dropping the client if it has fallen behind."""
+        try:
+            connection.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(
+                f"Send queue full for user {connection.user_id} in room {room_id}, disconnecting"
+            )
+            self.disconnect(websocket, room_id)
+            task = asyncio.create_task(self._close(websocket, 1013, "Client too slow"))
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str):
+        """Close a connection that the manager has dropped."""
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass  # Connection might already be closed
+
+    def send_init(self, room_id: str, websocket: WebSocket, code: str, language: str, timestamp):
+        """
+        Queue the initial room state for a new connection.
+
+        The data object is encoded once and reused until the room's code changes,
+        so a burst of reconnects doesn't re-encode the same document.
+        """
+        data = self._init_cache.get(room_id)
+        if data is None:
+            data = _encode({"room_id": room_id, "code": code, "language": language})
+            self._init_cache[room_id] = data
+
+        connection = self.active_connections.get(room_id, {}).get(websocket)
+        if connection is not None:
+            self._enqueue(
+                room_id, websocket, connection, _text_event(_frame("init", data, timestamp))
+            )
+
+    def send_error(
+        self, room_id: str, websocket: WebSocket, message: str, timestamp, cache: bool = True
+    ):
+        """
+        Queue an error frame for a single connection.
+
+        Pass cache=False when message includes client input, so arbitrary
+        (and arbitrarily large) strings are never kept in the memo.
+        """
+        connection = self.active_connections.get(room_id, {}).get(websocket)
+        if connection is not None:
+            data = _error_data(message) if cache else _encode({"message": message})
+            self._enqueue(
+                room_id, websocket, connection, _text_event(_frame("error", data, timestamp))
+            )
+
+    def broadcast(self, room_id: str, message: dict, exclude: Optional[WebSocket] = None):
         """
         Broadcast a message to all connections in a room.
 
+        Frames are queued for each connection's writer task, so this never
+        waits on the network.
+
         Args:
             room_id: The room to broadcast to
-            message: The message to send (will be converted to JSON)
+            message: The message to send (encoded to JSON once for all recipients)
             exclude: Optional WebSocket to exclude from broadcast (e.g., sender)
         """
-        if room_id not in self.active_connections:
-            return
+        members = self._members.get(room_id)
+        if members is None:
+            room = self.active_connections.get(room_id)
+            if room is None:
+                return
+            members = self._members[room_id] = tuple(room.items())
 
-        # Get list of connections to broadcast to
-        connections = [
-            ws for ws, uid in self.active_connections[room_id]
-            if ws != exclude
-        ]
+        # Encode once and queue the same text frame for every connection
+        event = _text_event(_encode(message))
 
-        # Send to all connections
-        disconnected = []
-        for connection in connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.warning(
-                    f"Failed to broadcast to connection in room {room_id}: {e}"
-                )
-                disconnected.append(connection)
-
-        # Clean up disconnected clients
-        if disconnected:
-            logger.info(
-                f"Cleaning up {len(disconnected)} disconnected clients from room {room_id}"
-            )
-            for connection in disconnected:
-                self.disconnect(connection, room_id)
+        # The snapshot is unaffected by clients that fall behind and are
+        # removed mid-loop
+        for websocket, connection in members:
+            if websocket is not exclude:
+                self._enqueue(room_id, websocket, connection, event)
     
+    def schedule_code_save(self, room_id: str, code: str):
+        """
+        Record the latest code for a room to be persisted by the flush loop.
+
+        Updates arriving between flushes replace the pending code, so only
+        the most recent value is written.
+        """
+        self._pending_code[room_id] = code
+        self._init_cache.pop(room_id, None)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def get_pending_code(self, room_id: str) -> Optional[str]:
+        """Get code for a room that has been received but not yet persisted."""
+        code = self._pending_code.get(room_id)
+        if code is None:
+            # Until its save commits, the database still has the old code
+            code = self._saving_code.get(room_id)
+        return code
+
+    async def _flush_loop(self):
+        """Persist pending code every CODE_FLUSH_INTERVAL until none is left."""
+        while self._pending_code:
+            await asyncio.sleep(CODE_FLUSH_INTERVAL)
+            self._saving_code, self._pending_code = self._pending_code, {}
+            for room_id in list(self._saving_code):
+                await self._save(room_id, self._saving_code[room_id])
+                del self._saving_code[room_id]
+        self._flush_task = None
+
+    async def _save(self, room_id: str, code: str):
+        """Persist code for a room, logging rather than raising on failure."""
+        if self._save_code is None:
+            return
+
+        try:
+            await self._save_code(room_id, code)
+            logger.debug(f"Saved code for room {room_id}")
+        except Exception as e:
+            logger.error(f"Failed to save code for room {room_id}: {e}")
+
+    async def flush_all(self):
+        """
+        Wait until all pending code is persisted. Call this on shutdown.
+
+        Saves only ever run in the flush loop, so writes for a room can't race
+        each other. The loop exits on its own once nothing is pending.
+        """
+        if self._flush_task is not None:
+            await self._flush_task
+
     def get_room_connection_count(self, room_id: str) -> int:
         """Get the number of active connections in a room."""
-        return len(self.active_connections.get(room_id, []))
+        return len(self.active_connections.get(room_id, ()))
 
     def get_user_id(self, websocket: WebSocket) -> Optional[str]:
         """Get user_id for a websocket connection."""
@@ -93,6 +93,9 @@ async def test_websocket():
 
             # Test 5: Verify room code was updated
             print("\n7. Verifying code was saved to database...")
+            # Code is persisted by a background flush loop, wait out
+            # CODE_FLUSH_INTERVAL (0.2s) before reading it back
+            await asyncio.sleep(1.0)
             response = requests.get(f'http://localhost:8000/rooms/{room_id}')
             updated_room = response.json()
             if updated_room['code'] == "print('Hello from WebSocket test!')":
@@ -101,6 +104,7 @@ async def test_websocket():
             else:
                 print(f"❌ Code not updated. Expected: print('Hello from WebSocket test!')")
                 print(f"   Got: {updated_room['code']}")
+                return False
 
             print("\n✅ All WebSocket tests passed!")
             return True
@@ -0,0 +1,93 @@
+"""
+Tests for AutocompleteService request coalescing.
+Run from backend/ with: python -m pytest tests
+"""
+
+import asyncio
+
+from app.services.autocomplete_service import AutocompleteService
+
+
+def slow_generate(service: AutocompleteService, calls: list):
+    """Replace _generate with one that yields, so requests overlap."""
+    original = service._generate
+
+    async def generate(code: str, language: str):
+        calls.append(code)
+        await asyncio.sleep(0.01)
+        return await original(code, language)
+
+    service._generate = generate
+
+
+def test_identical_requests_share_one_generation():
+    async def scenario():
+        service = AutocompleteService()
+        calls = []
+        slow_generate(service, calls)
+
+        results = await asyncio.gather(
+            *(service.get_suggestions("def hel", 7, "python") for _ in range(5))
+        )
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_same_prefix_with_different_code_is_not_coalesced():
+    async def scenario():
+        service = AutocompleteService()
+        calls = []
+        slow_generate(service, calls)
+
+        short, long = await asyncio.gather(
+            service.get_suggestions("def hel", 7, "python"),
+            service.get_suggestions("def hel" + "x" * 900, 7, "python"),
+        )
+
+        assert len(calls) == 2
+        assert short.confidence == 0.51
+        assert long.confidence == 0.95
+
+    asyncio.run(scenario())
+
+
+def test_joined_request_survives_cancelled_leader():
+    async def scenario():
+        service = AutocompleteService()
+        calls = []
+        slow_generate(service, calls)
+
+        leader = asyncio.create_task(service.get_suggestions("def hel", 7, "python"))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(service.get_suggestions("def hel", 7, "python"))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        result = await joiner
+        assert leader.cancelled()
+        assert len(result.suggestions) == 3
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_joiner_leaves_leader_running():
+    async def scenario():
+        service = AutocompleteService()
+        calls = []
+        slow_generate(service, calls)
+
+        leader = asyncio.create_task(service.get_suggestions("def hel", 7, "python"))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(service.get_suggestions("def hel", 7, "python"))
+        await asyncio.sleep(0)
+        joiner.cancel()
+
+        result = await leader
+        assert joiner.cancelled()
+        assert len(result.suggestions) == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,39 @@
+"""
+Tests for the WebSocket room snapshot cache.
+Run from backend/ with: python -m pytest tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from app.routes import websocket
+from app.services.room_service import room_cache
+
+
+def test_edit_during_snapshot_load_is_not_lost(monkeypatch):
+    async def scenario():
+        room_id = "00000000-0000-0000-0000-000000000001"
+        room_cache.pop(room_id, None)
+        reading, release = asyncio.Event(), asyncio.Event()
+
+        async def get_room(db, rid):
+            # The row is read, then an edit arrives before the load finishes
+            row = SimpleNamespace(code="# Start coding here...", language="python")
+            reading.set()
+            await release.wait()
+            return row
+
+        monkeypatch.setattr(websocket.room_service, "get_room", get_room)
+
+        load = asyncio.create_task(websocket.get_room_snapshot(room_id))
+        await reading.wait()
+        websocket.record_code_update(room_id, "NEW CODE")
+        release.set()
+
+        snapshot = await load
+        assert snapshot["code"] == "NEW CODE"
+        assert room_cache[room_id]["code"] == "NEW CODE"
+        assert room_id not in websocket._snapshot_loads
+        room_cache.pop(room_id, None)
+
+    asyncio.run(scenario())
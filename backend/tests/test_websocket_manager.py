@@ -0,0 +1,153 @@
+"""
+Tests for WebSocketManager: per-connection send queues and the code flush loop.
+Run from backend/ with: python -m pytest tests
+"""
+
+import asyncio
+import orjson
+
+from app.services import websocket_manager
+from app.services.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Stand-in for a Starlette WebSocket that records what it is sent."""
+
+    def __init__(self, fail: bool = False, block: bool = False):
+        self.fail = fail
+        self.block = block
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send(self, event: dict):
+        if self.fail:
+            raise RuntimeError("connection lost")
+        if self.block:
+            await asyncio.sleep(3600)
+        self.sent.append(orjson.loads(event["text"]))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.close_code = code
+
+
+async def settle():
+    """Let writer tasks drain their queues."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_broadcast_reaches_everyone_but_sender_in_order():
+    async def scenario():
+        manager = WebSocketManager()
+        sender, peer = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(sender, "room")
+        await manager.connect(peer, "room")
+
+        for i in range(3):
+            manager.broadcast("room", {"type": "cursor_position", "data": {"i": i}}, exclude=sender)
+        await settle()
+
+        assert sender.sent == []
+        assert [m["data"]["i"] for m in peer.sent] == [0, 1, 2]
+
+    asyncio.run(scenario())
+
+
+def test_client_that_falls_behind_is_dropped_and_closed(monkeypatch):
+    monkeypatch.setattr(websocket_manager, "SEND_QUEUE_SIZE", 2)
+
+    async def scenario():
+        manager = WebSocketManager()
+        slow = FakeWebSocket(block=True)
+        await manager.connect(slow, "room")
+        await settle()
+
+        # One frame is stuck in send, two fill the queue, the next overflows
+        for i in range(4):
+            manager.broadcast("room", {"type": "cursor_position", "data": {"i": i}})
+        await settle()
+
+        assert manager.get_room_connection_count("room") == 0
+        assert slow.close_code == 1013
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_drops_and_closes_client():
+    async def scenario():
+        manager = WebSocketManager()
+        broken, peer = FakeWebSocket(fail=True), FakeWebSocket()
+        await manager.connect(broken, "room")
+        await manager.connect(peer, "room")
+
+        manager.broadcast("room", {"type": "cursor_position", "data": {}})
+        await settle()
+
+        assert manager.get_room_connection_count("room") == 1
+        assert broken.close_code == 1011
+        assert peer.close_code is None
+
+    asyncio.run(scenario())
+
+
+def test_flush_loop_saves_only_the_latest_code(monkeypatch):
+    monkeypatch.setattr(websocket_manager, "CODE_FLUSH_INTERVAL", 0.01)
+
+    async def scenario():
+        saved = []
+
+        async def save_code(room_id: str, code: str):
+            saved.append((room_id, code))
+
+        manager = WebSocketManager(save_code=save_code)
+        for code in ("a", "ab", "abc"):
+            manager.schedule_code_save("room", code)
+        await manager.flush_all()
+
+        assert saved == [("room", "abc")]
+        assert manager.get_pending_code("room") is None
+
+    asyncio.run(scenario())
+
+
+def test_code_being_saved_stays_pending_until_committed(monkeypatch):
+    monkeypatch.setattr(websocket_manager, "CODE_FLUSH_INTERVAL", 0.01)
+
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def save_code(room_id: str, code: str):
+            started.set()
+            await release.wait()
+
+        manager = WebSocketManager(save_code=save_code)
+        manager.schedule_code_save("room", "new code")
+        await started.wait()
+
+        # A client joining mid-save must not get the old row from the database
+        assert manager.get_pending_code("room") == "new code"
+
+        release.set()
+        await manager.flush_all()
+        assert manager.get_pending_code("room") is None
+
+    asyncio.run(scenario())
+
+
+def test_error_frames_with_client_input_are_not_memoized():
+    async def scenario():
+        manager = WebSocketManager()
+        client = FakeWebSocket()
+        await manager.connect(client, "room")
+        before = websocket_manager._error_data.cache_info().currsize
+
+        manager.send_error("room", client, "Unknown message type: " + "x" * 1000, "now", cache=False)
+        await settle()
+
+        assert websocket_manager._error_data.cache_info().currsize == before
+        assert client.sent[0]["data"]["message"].startswith("Unknown message type: x")
+
+    asyncio.run(scenario())